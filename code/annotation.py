@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+from PIL import Image
+from paddleocr import draw_ocr
+
+
+"""
+ANNOTATION
+- The OCR pipeline only stores boxes, text and scores with the result (no drawing inline)
+- The annotated image (like "ocr example/annotated.jpg") is rendered only when requested
+    - rendering runs in a background thread pool, callers get a Future
+    - rendered files are cached on disk, least recently used files are evicted past max_bytes
+      (files already in cache_dir are picked up at startup by modification time)
+"""
+
+
+@dataclass
+class OcrAnnotation:
+    image_path: str
+    boxes: List[List[List[float]]]
+    text: List[str]
+    scores: List[float]
+
+
+def annotation_from_result(image_path: str, result) -> OcrAnnotation:
+    # Same unpacking as the retailer scripts, kept with the result for later rendering
+    return OcrAnnotation(
+        image_path=image_path,
+        boxes=[line[0] for line in result[0]],
+        text=[line[1][0] for line in result[0]],
+        scores=[line[1][1] for line in result[0]]
+    )
+
+
+class AnnotationRenderer:
+    def __init__(self, font_path: str, cache_dir: str = "annotated", max_bytes: int = 200 * 1024 * 1024,
+                 max_workers: int = 2):
+        # draw_ocr needs a .ttf font, its default path only exists in a PaddleOCR source checkout
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.font_path = font_path
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.cache: "OrderedDict[str, int]" = OrderedDict()  # rendered path -> size in bytes
+        self.cache_size = 0
+        self.pending: Dict[str, Future] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        # Renders from earlier runs count towards max_bytes, oldest first
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".jpg") and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._add_to_cache(path, size)
+
+    def cache_path(self, annotation: OcrAnnotation) -> str:
+        key = hashlib.sha1(
+            (annotation.image_path + "|" + "|".join(annotation.text)).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.jpg")
+
+    def request(self, annotation: OcrAnnotation) -> Future:
+        """
+        Returns a Future resolving to the annotated image path. Never draws on the caller's thread.
+        """
+        path = self.cache_path(annotation)
+        with self.lock:
+            if path in self.cache and os.path.exists(path):
+                self.cache.move_to_end(path)
+                # mtime keeps the recency order across restarts
+                os.utime(path)
+                future = Future()
+                future.set_result(path)
+                return future
+            # Concurrent requests for the same image share one render
+            if path in self.pending:
+                return self.pending[path]
+            future = self.executor.submit(self._render, annotation, path)
+            self.pending[path] = future
+            return future
+
+    def _render(self, annotation: OcrAnnotation, path: str) -> str:
+        try:
+            image = Image.open(annotation.image_path).convert("RGB")
+            annotated = draw_ocr(image, annotation.boxes, annotation.text, annotation.scores,
+                                 font_path=self.font_path)
+            Image.fromarray(annotated).save(path)
+            with self.lock:
+                self._add_to_cache(path, os.path.getsize(path))
+            return path
+        finally:
+            with self.lock:
+                self.pending.pop(path, None)
+
+    def _add_to_cache(self, path: str, size: int) -> None:
+        if path in self.cache:
+            self.cache_size -= self.cache.pop(path)
+        self.cache[path] = size
+        self.cache_size += size
+        # Evict least recently used renders, always keep the one just drawn
+        while self.cache_size > self.max_bytes and len(self.cache) > 1:
+            old_path, old_size = self.cache.popitem(last=False)
+            self.cache_size -= old_size
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+"""
+# Example usage:
+from paddleocr import PaddleOCR
+
+ocr = PaddleOCR(lang="en", use_angle_cls=True)
+image_path = "receipts/lidl#3.jpeg"
+annotation = annotation_from_result(image_path, ocr.ocr(image_path, cls=True))
+
+renderer = AnnotationRenderer("fonts/simfang.ttf", cache_dir="annotated")
+future = renderer.request(annotation)  # returns immediately
+print(future.result())  # only wait when the annotated image is actually needed
+"""
@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+from typing import Iterable, Iterator, List, Union
+from paddleocr import PaddleOCR
+# Available once paddleocr has been imported (it puts its bundled tools package on the path)
+from tools.infer.predict_system import sorted_boxes
+from tools.infer.utility import get_rotate_crop_image
+
+
+"""
+BATCHING
+- ocr.ocr() runs detection -> angle classifier -> recognition per image,
+  so a receipt with a handful of lines leaves most of the recognition batch empty
+- This engine:
+    - runs detection per image (input sizes differ, cannot be batched)
+    - pools the cropped text regions of many images
+    - runs the angle classifier and recogniser on the pooled crops in large batches
+    - scatters the text back to each image in the original line order
+- Output per image has the same shape as ocr.ocr(), so result[0] unpacking in
+  tesco.py / sainsbury.py / lidl.py stays the same
+"""
+
+
+class BatchedOCR:
+    def __init__(self, ocr: PaddleOCR, rec_batch_size: int = 64):
+        self.ocr = ocr
+        self.rec_batch_size = rec_batch_size
+
+    def detect(self, image: np.ndarray) -> List[np.ndarray]:
+        dt_boxes, _ = self.ocr.text_detector(image)
+        if dt_boxes is None:
+            return []
+        return list(sorted_boxes(dt_boxes))
+
+    def recognize(self, crops: List[np.ndarray], cls: bool) -> list:
+        """
+        Runs the angle classifier and recogniser on the pooled crops with rec_batch_size.
+        The batch sizes are set on the shared PaddleOCR instance only for this call and
+        restored afterwards, so do not share the instance with another thread while it runs.
+        """
+        # The recogniser sorts its input by aspect ratio and slices it into batches of this size
+        recognizer = self.ocr.text_recognizer
+        classifier = self.ocr.text_classifier if cls and self.ocr.use_angle_cls else None
+        rec_batch_num = recognizer.rec_batch_num
+        cls_batch_num = classifier.cls_batch_num if classifier is not None else None
+        try:
+            recognizer.rec_batch_num = self.rec_batch_size
+            if classifier is not None:
+                classifier.cls_batch_num = self.rec_batch_size
+                crops, _, _ = classifier(crops)
+            rec_res, _ = recognizer(crops)
+        finally:
+            recognizer.rec_batch_num = rec_batch_num
+            if classifier is not None:
+                classifier.cls_batch_num = cls_batch_num
+        return rec_res
+
+    def ocr_images(self, images: List[Union[str, np.ndarray]], cls: bool = True) -> List[list]:
+        all_crops = []
+        per_image_boxes = []
+        for image in images:
+            if isinstance(image, str):
+                image_path = image
+                image = cv2.imread(image_path)
+                if image is None:
+                    raise ValueError(f"Could not read image: {image_path}")
+            boxes = self.detect(image)
+            per_image_boxes.append(boxes)
+            all_crops.extend(get_rotate_crop_image(image, np.copy(box).astype(np.float32)) for box in boxes)
+
+        rec_res = self.recognize(all_crops, cls) if all_crops else []
+
+        # Scatter back: crops were appended image by image, so offsets give each image's slice
+        results = []
+        offset = 0
+        for boxes in per_image_boxes:
+            lines = []
+            for box, (text, score) in zip(boxes, rec_res[offset:offset + len(boxes)]):
+                if score >= self.ocr.drop_score:
+                    lines.append([box.tolist(), (text, score)])
+            offset += len(boxes)
+            results.append([lines])
+        return results
+
+    def ocr_stream(self, images: Iterable[Union[str, np.ndarray]], images_per_batch: int = 16,
+                   cls: bool = True) -> Iterator[list]:
+        """
+        Yields one ocr.ocr() style result per input image, in input order.
+        """
+        chunk = []
+        for image in images:
+            chunk.append(image)
+            if len(chunk) == images_per_batch:
+                yield from self.ocr_images(chunk, cls=cls)
+                chunk = []
+        if chunk:
+            yield from self.ocr_images(chunk, cls=cls)
+
+
+"""
+# Example usage:
+ocr = PaddleOCR(
+    lang="en",
+    use_angle_cls=True,
+    det_db_thresh=0.6,
+    det_db_box_thresh=0.5,
+    det_db_unclip_ratio=1.8
+)
+engine = BatchedOCR(ocr, rec_batch_size=64)
+paths = ["receipts/lidl#3.jpeg", "receipts/tesco#1.jpeg", "receipts/sainsbury#8.jpeg"]
+for path, result in zip(paths, engine.ocr_stream(paths)):
+    text = [line[1][0] for line in result[0]]
+    print(path, text)
+"""
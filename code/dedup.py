@@ -0,0 +1,369 @@
+import hashlib
+import itertools
+import re
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+"""
+DEDUP
+- Exact duplicate: sha256 of the uploaded file bytes (checked before the image is decoded)
+- Near duplicate:
+    - the paper is found (largest bright region) and warped upright, so re-crops and
+      a slightly different angle give the same picture of the receipt
+    - 256 bit difference hash (16 x 16 dHash) of the paper, lookup by Hamming distance
+      through a multi-index (hash split into 16 bands of 16 bits)
+    - the hash bits are shuffled with a fixed permutation before banding, otherwise every band
+      is one dHash row and the blank paper margins put most receipts in the same buckets
+    - hash candidates are filtered with a text layout signature (adaptive threshold ink mask
+      of the paper) because receipts of the same store can still look alike at 16 x 16
+    - layout alone cannot tell a weekly repeat shop (same items, different prices) apart,
+      so the candidate's key lines (total, date / time) are cropped from the new photo,
+      recognised again and compared with the text stored for them
+- Only a verified match returns the previously parsed result and skips OCR,
+  without an OCR engine to verify with there are no near duplicate hits
+- Memory: roughly 1.5 KB per stored receipt (hash, bucket entries, 384 byte ink mask in one
+  shared array, up to MAX_KEY_LINES key line boxes and texts), so about 1.5 GB per million
+  receipts on top of the parsed results
+"""
+
+
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+BAND_BITS = 16
+NUM_BANDS = HASH_BITS // BAND_BITS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+SIGNATURE_SIZE = (32, 96)  # width, height of the ink mask, receipts are tall
+SIGNATURE_BYTES = SIGNATURE_SIZE[0] * SIGNATURE_SIZE[1] // 8
+
+# Fixed so hashes stored by one process can be queried by another
+BIT_PERMUTATION = np.random.default_rng(20240101).permutation(HASH_BITS)
+
+MAX_KEY_LINES = 6
+TOTAL_ANCHORS = ["TOTAL", "BALANCE DUE"]
+date_time_pattern = r'\d{1,2}/\d{2}/\d{2,4}|\d{1,2}[A-Z]{3}\d{4}|\d{2}:\d{2}'
+
+
+@dataclass
+class Fingerprint:
+    dhash: int
+    signature: np.ndarray  # packed bits of the ink mask
+    image: np.ndarray  # full resolution photo, only kept while the upload is processed
+    to_paper: np.ndarray  # 3x3 transform: photo pixels -> paper coordinates in [0, 1]
+
+
+def dhash(image: np.ndarray, hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image: 1 bit per horizontal gradient sign
+    on a (hash_size + 1) x hash_size grayscale thumbnail.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(diff).tobytes(), "big")
+
+
+def order_corners(points: np.ndarray) -> np.ndarray:
+    # top left, top right, bottom right, bottom left
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)], points[np.argmin(diffs)],
+        points[np.argmax(sums)], points[np.argmax(diffs)]
+    ], dtype=np.float32)
+
+
+def paper_region(gray: np.ndarray, min_area: float = 0.2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Warps the largest bright region (the receipt paper) upright.
+    Returns (paper, 3x3 transform from gray pixels to paper pixels).
+    The whole image is the paper if no region covers at least min_area of it.
+    """
+    whole = (gray, np.eye(3))
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return whole
+    contour = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(contour) < min_area * gray.shape[0] * gray.shape[1]:
+        return whole
+
+    corners = order_corners(cv2.boxPoints(cv2.minAreaRect(contour)))
+    width = int(max(np.linalg.norm(corners[0] - corners[1]), np.linalg.norm(corners[3] - corners[2])))
+    height = int(max(np.linalg.norm(corners[0] - corners[3]), np.linalg.norm(corners[1] - corners[2])))
+    if width < 2 or height < 2:
+        return whole
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    transform = cv2.getPerspectiveTransform(corners, target)
+    if width > height:
+        # Same as cv2.ROTATE_90_CLOCKWISE: (x, y) -> (height - 1 - y, x)
+        transform = np.array([[0, -1, height - 1], [1, 0, 0], [0, 0, 1]], dtype=np.float64) @ transform
+        width, height = height, width
+    return cv2.warpPerspective(gray, transform, (width, height)), transform
+
+
+def ink_signature(paper: np.ndarray) -> np.ndarray:
+    # Where the text lines are and how long they are, independent of lighting
+    small = cv2.resize(paper, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    ink = cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 11, 10)
+    return np.packbits(ink > 0)
+
+
+def signature_mismatch(a: np.ndarray, b: np.ndarray) -> float:
+    # Differing ink pixels over all ink pixels, so the blank paper does not dilute the difference
+    differ = np.unpackbits(np.bitwise_xor(a, b)).sum()
+    ink = np.unpackbits(np.bitwise_or(a, b)).sum()
+    return float(differ / ink) if ink else 0.0
+
+
+def fingerprint_file(image_path: str) -> Fingerprint:
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # Downscale first so the cost does not depend on the photo resolution
+    height, width = gray.shape
+    scale = min(768 / max(height, width), 1.0)
+    if scale < 1:
+        gray = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    paper, transform = paper_region(gray)
+
+    # photo -> downscaled photo -> paper pixels -> paper coordinates in [0, 1]
+    to_paper = np.diag([1 / paper.shape[1], 1 / paper.shape[0], 1.0]) @ transform @ np.diag([scale, scale, 1.0])
+    return Fingerprint(dhash=dhash(paper), signature=ink_signature(paper), image=image, to_paper=to_paper)
+
+
+def key_line_indices(text: List[str]) -> List[int]:
+    # Total (anchor and the value after it) and date / time lines, these differ between shops
+    indices = []
+    for i, line in enumerate(text):
+        if any(anchor in line.upper() for anchor in TOTAL_ANCHORS):
+            indices.extend(j for j in (i, i + 1) if j < len(text))
+        elif re.search(date_time_pattern, line):
+            indices.append(i)
+    return sorted(set(indices))[:MAX_KEY_LINES]
+
+
+def normalize_field(text: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", text.upper())
+
+
+def crop_quad(image: np.ndarray, quad: np.ndarray, pad: float = 0.2) -> np.ndarray:
+    # Perspective crop of a (tl, tr, br, bl) quad, padded by a share of the line height
+    tl, tr, br, bl = quad.astype(np.float32)
+    width = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+    height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+    across = (tr - tl) / max(np.linalg.norm(tr - tl), 1e-6) * height * pad
+    down = (bl - tl) / max(np.linalg.norm(bl - tl), 1e-6) * height * pad
+    source = np.array([tl - across - down, tr + across - down, br + across + down, bl - across + down],
+                      dtype=np.float32)
+    out_width, out_height = int(width + 2 * height * pad) + 1, int(height * (1 + 2 * pad)) + 1
+    target = np.array([[0, 0], [out_width, 0], [out_width, out_height], [0, out_height]], dtype=np.float32)
+    return cv2.warpPerspective(image, cv2.getPerspectiveTransform(source, target), (out_width, out_height),
+                               borderMode=cv2.BORDER_REPLICATE)
+
+
+def file_digest(image_path: str) -> str:
+    with open(image_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def permute_bits(value: int) -> int:
+    # Hamming distances are unchanged, but neighbouring dHash bits end up in different bands
+    bits = np.unpackbits(np.frombuffer(value.to_bytes(HASH_BITS // 8, "big"), dtype=np.uint8))
+    return int.from_bytes(np.packbits(bits[BIT_PERMUTATION]).tobytes(), "big")
+
+
+def split_bands(value: int) -> List[int]:
+    return [(value >> (i * BAND_BITS)) & BAND_MASK for i in range(NUM_BANDS)]
+
+
+def band_neighbours(band: int, radius: int) -> List[int]:
+    # All band values within `radius` bit flips of `band` (including band itself)
+    neighbours = [band]
+    for r in range(1, radius + 1):
+        for bits in itertools.combinations(range(BAND_BITS), r):
+            flipped = band
+            for bit in bits:
+                flipped ^= 1 << bit
+            neighbours.append(flipped)
+    return neighbours
+
+
+class HammingIndex:
+    """
+    Multi-index hashing over HASH_BITS bit hashes.
+    By the pigeonhole principle, two hashes within distance d share at least one band
+    that differs in at most d // NUM_BANDS bits, so only those buckets are probed.
+    Buckets holding more than max_bucket hashes are skipped instead of scanned, a near
+    duplicate only found through such a bucket is missed (it costs one OCR run, not a wrong result).
+    """
+
+    def __init__(self, max_distance: int = 24, max_bucket: int = 256):
+        self.max_distance = max_distance
+        self.max_bucket = max_bucket
+        self.band_radius = max_distance // NUM_BANDS
+        self.hashes: List[int] = []
+        self.keys: List[Any] = []
+        self.bands: List[Dict[int, List[int]]] = [{} for _ in range(NUM_BANDS)]
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, value: int, key: Any) -> None:
+        value = permute_bits(value)
+        idx = len(self.hashes)
+        self.hashes.append(value)
+        self.keys.append(key)
+        for band_idx, band in enumerate(split_bands(value)):
+            self.bands[band_idx].setdefault(band, []).append(idx)
+
+    def query(self, value: int) -> List[Tuple[Any, int]]:
+        """
+        Returns [(key, distance)] of the stored hashes within max_distance, closest first.
+        """
+        value = permute_bits(value)
+        matches = []
+        seen = set()
+        for band_idx, band in enumerate(split_bands(value)):
+            buckets = self.bands[band_idx]
+            for probe in band_neighbours(band, self.band_radius):
+                bucket = buckets.get(probe, ())
+                if len(bucket) > self.max_bucket:
+                    continue
+                for idx in bucket:
+                    if idx in seen:
+                        continue
+                    seen.add(idx)
+                    distance = (self.hashes[idx] ^ value).bit_count()
+                    if distance <= self.max_distance:
+                        matches.append((self.keys[idx], distance))
+        return sorted(matches, key=lambda match: match[1])
+
+
+@dataclass
+class DedupStats:
+    lookups: int = 0
+    exact_hits: int = 0
+    near_hits: int = 0
+    rejected_candidates: int = 0  # hash matches that failed the layout or key line check
+    misses: int = 0
+
+    def hit_rates(self) -> Dict[str, float]:
+        total = self.lookups or 1
+        return {
+            "exact": self.exact_hits / total,
+            "near": self.near_hits / total,
+            "total": (self.exact_hits + self.near_hits) / total,
+        }
+
+
+@dataclass
+class DedupCache:
+    max_distance: int = 24
+    max_mismatch: float = 0.2  # share of ink pixels allowed to differ on a confirmed match
+    results: Dict[str, Any] = field(default_factory=dict)  # receipt id -> parsed result
+    digests: Dict[str, str] = field(default_factory=dict)  # sha256 -> receipt id
+    key_lines: Dict[str, Tuple[np.ndarray, List[str]]] = field(default_factory=dict)  # receipt id -> (quads, texts)
+    stats: DedupStats = field(default_factory=DedupStats)
+
+    def __post_init__(self):
+        self.index = HammingIndex(self.max_distance)
+        # Ink masks as rows of one array instead of one numpy object per receipt
+        self.signatures = np.zeros((1024, SIGNATURE_BYTES), dtype=np.uint8)
+        self.signature_rows: Dict[str, int] = {}  # receipt id -> row
+
+    def verify(self, ocr, receipt_id: str, fingerprint: Fingerprint) -> bool:
+        """
+        Re-reads the candidate's key lines from the new photo and compares them
+        with the text stored for the candidate. Unverifiable candidates are rejected.
+        """
+        if ocr is None or receipt_id not in self.key_lines:
+            return False
+        quads, texts = self.key_lines[receipt_id]
+        # paper coordinates -> pixels of the new photo
+        to_photo = np.linalg.inv(fingerprint.to_paper)
+        points = cv2.perspectiveTransform(quads.reshape(-1, 1, 2).astype(np.float64), to_photo).reshape(-1, 4, 2)
+        crops = [crop_quad(fingerprint.image, quad) for quad in points]
+        rec_res, _ = ocr.text_recognizer(crops)
+        return all(normalize_field(new_text) == normalize_field(text)
+                   for (new_text, _), text in zip(rec_res, texts))
+
+    def lookup(self, image_path: str, ocr=None) -> Tuple[Optional[Any], str, Optional[Fingerprint]]:
+        """
+        Returns (parsed result or None, sha256 digest, fingerprint) so a miss can be stored
+        without decoding the image a second time. The fingerprint is None on an exact hit.
+        Near duplicates are only returned if `ocr` is given to verify their key lines with.
+        """
+        self.stats.lookups += 1
+        digest = file_digest(image_path)
+        if digest in self.digests:
+            self.stats.exact_hits += 1
+            return self.results[self.digests[digest]], digest, None
+
+        fingerprint = fingerprint_file(image_path)
+        for receipt_id, _ in self.index.query(fingerprint.dhash):
+            row = self.signatures[self.signature_rows[receipt_id]]
+            if (signature_mismatch(row, fingerprint.signature) <= self.max_mismatch
+                    and self.verify(ocr, receipt_id, fingerprint)):
+                self.stats.near_hits += 1
+                return self.results[receipt_id], digest, fingerprint
+            self.stats.rejected_candidates += 1
+
+        self.stats.misses += 1
+        return None, digest, fingerprint
+
+    def store(self, receipt_id: str, digest: str, fingerprint: Fingerprint, parsed: Any,
+              lines: Optional[list] = None) -> None:
+        """
+        lines: the OCR result lines (result[0]) the parsed result came from,
+        their key lines are kept so later near duplicates can be verified.
+        """
+        self.results[receipt_id] = parsed
+        indices = key_line_indices([line[1][0] for line in lines or []])
+        if indices:
+            quads = np.array([lines[i][0] for i in indices], dtype=np.float64).reshape(-1, 1, 2)
+            quads = cv2.perspectiveTransform(quads, fingerprint.to_paper).reshape(-1, 4, 2).astype(np.float32)
+            self.key_lines[receipt_id] = (quads, [lines[i][1][0] for i in indices])
+        self.digests[digest] = receipt_id
+        row = len(self.signature_rows)
+        if row == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+        self.signatures[row] = fingerprint.signature
+        self.signature_rows[receipt_id] = row
+        self.index.add(fingerprint.dhash, receipt_id)
+
+
+def ocr_once(ocr, image_path: str, parse: Callable[[List[str]], Any], cache: DedupCache,
+             receipt_id: Optional[str] = None) -> Any:
+    """
+    Runs OCR and parsing only if the image is not a (near) duplicate of an earlier upload.
+    """
+    parsed, digest, fingerprint = cache.lookup(image_path, ocr)
+    if parsed is not None:
+        return parsed
+
+    result = ocr.ocr(image_path, cls=True)
+    # PaddleOCR returns [None] for an image without text
+    lines = result[0] or []
+    parsed = parse([line[1][0] for line in lines])
+    cache.store(receipt_id or digest, digest, fingerprint, parsed, lines)
+    return parsed
+
+
+"""
+# Example usage:
+from paddleocr import PaddleOCR
+from tesco import extract_receipt_info
+
+ocr = PaddleOCR(lang="en", use_angle_cls=True)
+cache = DedupCache()
+for path in ["receipts/tesco#1.jpeg", "receipts/tesco#1_recrop.jpeg"]:
+    print(ocr_once(ocr, path, extract_receipt_info, cache))
+print(cache.stats, cache.stats.hit_rates())
+"""
@@ -0,0 +1,245 @@
+import gc
+import multiprocessing
+import os
+import queue
+import time
+import cv2
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import connection
+from multiprocessing.connection import Connection
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from paddleocr import PaddleOCR
+
+
+"""
+FORK SERVER
+- Loading the detection, angle classifier and recognition models takes seconds per process
+- The parent process loads and warms every config once, then forks workers
+    - workers share the model weights copy-on-write, nothing is loaded again
+    - gc.freeze() moves the loaded objects out of the collector so its bookkeeping
+      does not touch (and copy) the shared pages
+- New workers can be added at any time, each runs a first OCR job before it counts as ready
+- Workers that die (OOM killer, segfault in the inference library) are detected, their
+  in-flight job is reported as an error and a replacement worker is forked
+- Linux / macOS only (needs fork)
+"""
+
+
+# Same settings as the retailer scripts
+TESCO_SAINSBURY_CONFIG = dict(
+    lang="en",
+    use_angle_cls=True,  # Detect text orientation
+    det_db_thresh=0.6,   # Adjust detection threshold
+    det_db_box_thresh=0.5,  # Adjust box threshold
+    det_db_unclip_ratio=1.8  # Adjust unclip ratio
+)
+
+LIDL_CONFIG = dict(lang="en", use_angle_cls=True)
+
+CONFIGS = {
+    "tesco": TESCO_SAINSBURY_CONFIG,
+    "sainsbury": TESCO_SAINSBURY_CONFIG,
+    "lidl": LIDL_CONFIG,
+}
+
+# Filled in the parent before forking, inherited by every worker
+ENGINES: Dict[str, PaddleOCR] = {}
+
+# How often add_workers checks that a worker still starting up is alive
+POLL_INTERVAL = 0.5
+
+
+def warm_image() -> np.ndarray:
+    # A blank image gives no boxes, so the classifier and recogniser would not run.
+    # Render some receipt text so all three models do.
+    image = np.full((96, 480, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "TOTAL 12.34", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+    return image
+
+
+def warm_up(engine: PaddleOCR) -> None:
+    warm = warm_image()
+    engine.ocr(warm, cls=True)
+
+    # Run the classifier and recogniser directly too, in case detection misses the text
+    crop = warm[10:90, :]
+    if engine.use_angle_cls:
+        engine.text_classifier([crop])
+    engine.text_recognizer([crop])
+
+
+def load_engines() -> None:
+    loaded = {}
+    for retailer, config in CONFIGS.items():
+        key = repr(sorted(config.items()))
+        if key not in loaded:
+            engine = PaddleOCR(show_log=False, **config)
+            warm_up(engine)
+            loaded[key] = engine
+        ENGINES[retailer] = loaded[key]
+
+
+def worker_loop(tasks, conn, current, ready) -> None:
+    # First job: the first inference in a fresh process is the slow one (copy-on-write page
+    # faults, inference thread pools), run it before taking real work
+    image = warm_image()
+    for engine in {id(engine): engine for engine in ENGINES.values()}.values():
+        engine.ocr(image, cls=True)
+    ready.set()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, retailer, image_path = task
+        # Shared memory write, visible to the parent even if this process is killed mid-job
+        current.value = job_id
+        try:
+            result = ENGINES[retailer].ocr(image_path, cls=True)
+            message = (job_id, result, None)
+        except Exception as e:
+            message = (job_id, None, repr(e))
+        # Pipe send is synchronous (a Queue buffers in a thread that dies with the process),
+        # once it returns the result survives this worker being killed
+        conn.send(message)
+
+
+@dataclass
+class Worker:
+    process: multiprocessing.Process
+    conn: Connection  # parent's end of the worker's result pipe
+    current: object  # shared int, id of the last job taken or -1
+    ready: object  # event, set once the first job is done
+
+
+class ForkServer:
+    def __init__(self):
+        self.context = multiprocessing.get_context("fork")
+        self.tasks = self.context.Queue()
+        self.workers: List[Worker] = []
+        self.next_job_id = 0
+        self.pending: Set[int] = set()
+        # Finished jobs read but not handed out yet, and errors for jobs lost with a dead worker
+        self.done: Deque[Tuple[int, Optional[list], Optional[str]]] = deque()
+
+        load_engines()
+        gc.collect()
+        gc.freeze()
+
+    def start_worker(self) -> Worker:
+        conn, child_conn = self.context.Pipe(duplex=False)
+        current = self.context.Value("q", -1, lock=False)
+        ready = self.context.Event()
+        process = self.context.Process(target=worker_loop, args=(self.tasks, child_conn, current, ready),
+                                       daemon=True)
+        process.start()
+        # Only the worker may hold the write end, or reads would never see EOF when it dies
+        child_conn.close()
+        worker = Worker(process, conn, current, ready)
+        self.workers.append(worker)
+        return worker
+
+    def add_workers(self, count: int) -> float:
+        """
+        Forks `count` new workers and waits until each has finished a first OCR job.
+        Returns the time until all of them were ready, in seconds.
+        """
+        start = time.perf_counter()
+        new_workers = [self.start_worker() for _ in range(count)]
+        for worker in new_workers:
+            while not worker.ready.wait(POLL_INTERVAL):
+                if not worker.process.is_alive():
+                    raise RuntimeError(f"Worker {worker.process.pid} exited with code "
+                                       f"{worker.process.exitcode} before finishing its first job")
+        return time.perf_counter() - start
+
+    def read_results(self, worker: Worker) -> None:
+        while worker.conn.poll():
+            try:
+                job_id, result, error = worker.conn.recv()
+            except (EOFError, OSError):
+                break  # worker exited, or was killed half way through a send
+            if job_id in self.pending:
+                self.pending.discard(job_id)
+                self.done.append((job_id, result, error))
+
+    def check_workers(self) -> None:
+        # A killed worker never sends a result, report its job as failed and fork a replacement
+        for worker in [worker for worker in self.workers if not worker.process.is_alive()]:
+            # Whatever it sent before exiting is still in the pipe, a finished job is not lost
+            self.read_results(worker)
+            worker.conn.close()
+            self.workers.remove(worker)
+
+            job_id = worker.current.value
+            if job_id in self.pending:
+                self.pending.discard(job_id)
+                self.done.append((job_id, None, f"Worker {worker.process.pid} exited with code "
+                                                f"{worker.process.exitcode} while processing the job"))
+            self.start_worker()
+
+    def submit(self, retailer: str, image_path: str) -> int:
+        job_id = self.next_job_id
+        self.next_job_id += 1
+        self.pending.add(job_id)
+        self.tasks.put((job_id, retailer, image_path))
+        return job_id
+
+    def get_result(self, timeout: Optional[float] = None) -> Tuple[int, Optional[list], Optional[str]]:
+        """
+        Returns (job_id, ocr result, error) for the next finished job, in completion order.
+        Jobs lost with a dead worker come back with an error instead of blocking forever.
+        Raises queue.Empty if nothing finished within timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.done:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            # Wakes up on a result or on a worker exiting
+            connection.wait([worker.conn for worker in self.workers] +
+                            [worker.process.sentinel for worker in self.workers], remaining)
+            for worker in self.workers:
+                self.read_results(worker)
+            self.check_workers()
+        return self.done.popleft()
+
+    def shutdown(self) -> None:
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.process.join()
+            worker.conn.close()
+        self.workers = []
+
+
+def pss_mb(pid: int) -> float:
+    # Proportional set size splits shared pages between processes, so it does not count weights 8 times
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+if __name__ == "__main__":
+    server = ForkServer()
+    elapsed = server.add_workers(8)
+    print(f"Forked 8 workers and ran their first jobs in {elapsed * 1000:.1f} ms")
+
+    jobs = {
+        server.submit("lidl", "receipts/lidl#3.jpeg"): "lidl",
+        server.submit("sainsbury", "receipts/sainsbury#8.jpeg"): "sainsbury",
+    }
+    for _ in jobs:
+        job_id, result, error = server.get_result()
+        print(jobs[job_id], error or [line[1][0] for line in result[0]])
+
+    total = pss_mb(os.getpid()) + sum(pss_mb(worker.process.pid) for worker in server.workers)
+    print(f"Total PSS: {total:.0f} MB")
+    server.shutdown()
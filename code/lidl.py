@@ -21,21 +21,6 @@ class LidlReceipt:
     market_name: str = "Lidl"
     vat_number: str = "GB 341 8559 95"
 
-# OCR
-ocr = PaddleOCR(lang="en", use_angle_cls=True)
-result = ocr.ocr("receipts/lidl#3.jpeg", cls=True)
-
-boxes = [line[0] for line in result[0]]
-text = [line[1][0] for line in result[0]]
-scores = [line[1][1] for line in result[0]]
-
-print("--------------------------------")
-print(text)
-print("--------------------------------")
-
-
-
-
 def receipt_info(text: List[str]) -> LidlReceipt:
     # Extract market address
     market_address = text[1]  # 'LON-Stratford'
@@ -60,12 +45,12 @@ def receipt_info(text: List[str]) -> LidlReceipt:
     shopping_date = datetime.strptime(date_str, "%d/%m/%y")
 
     # Extract items using the existing extract_items function
-    #items = extract_items(text)
+    items = extract_items(text)
 
     return LidlReceipt(
         market_address=market_address,
         total_price=total_price,
-        items=0,
+        items=items,
         payment_type=payment_type,
         shopping_time=shopping_time,
         shopping_date=shopping_date
@@ -111,13 +96,22 @@ def extract_items(text_list: List[str]) -> List[Item]:
             i += 1
     return items
 
-#"""
-# Example usage:
-items = extract_items(text)
-for item in items:
-    print(f"Item: {item.name}, Price: {item.price}")
-#"""
+if __name__ == "__main__":
+    # OCR
+    ocr = PaddleOCR(lang="en", use_angle_cls=True)
+    result = ocr.ocr("receipts/lidl#3.jpeg", cls=True)
 
-#print(receipt_info(text))
+    boxes = [line[0] for line in result[0]]
+    text = [line[1][0] for line in result[0]]
+    scores = [line[1][1] for line in result[0]]
+
+    print("--------------------------------")
+    print(text)
+    print("--------------------------------")
 
+    # Example usage:
+    items = extract_items(text)
+    for item in items:
+        print(f"Item: {item.name}, Price: {item.price}")
 
+    #print(receipt_info(text))
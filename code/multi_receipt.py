@@ -0,0 +1,146 @@
+import re
+from concurrent.futures import Executor
+from statistics import median
+from typing import Any, List, Optional, Tuple
+
+import lidl
+import sainsbury
+import tesco
+
+
+"""
+MULTI RECEIPT
+- A photo with several receipts side by side comes back from OCR as one result[0] list
+- Detection boxes are grouped into receipts by their horizontal extent:
+    - boxes are merged into columns separated by empty vertical strips
+      (wider than gap_factor x the median line height)
+    - one receipt is often several columns (item names, prices), so columns are only
+      cut apart between two columns that mention a retailer, at the widest strip
+    - the split is kept only if every part has a retailer and a price, else one receipt
+- Each group keeps the OCR line order, then retailer detection and parsing run
+  on every group (in parallel when an executor is passed in)
+"""
+
+
+price_pattern = r'\d+\.\d{2}'
+
+
+def box_x_range(box: List[List[float]]) -> Tuple[float, float]:
+    xs = [point[0] for point in box]
+    return min(xs), max(xs)
+
+
+def box_height(box: List[List[float]]) -> float:
+    ys = [point[1] for point in box]
+    return max(ys) - min(ys)
+
+
+def x_columns(lines: list, gap: float) -> List[Tuple[float, float, List[int]]]:
+    """
+    Merges overlapping x ranges into columns, left to right: [(x_min, x_max, line indices)].
+    """
+    order = sorted(range(len(lines)), key=lambda i: box_x_range(lines[i][0])[0])
+    columns = []
+    for i in order:
+        x_min, x_max = box_x_range(lines[i][0])
+        if not columns or x_min > columns[-1][1] + gap:
+            columns.append((x_min, x_max, [i]))
+        else:
+            column_min, column_max, indices = columns[-1]
+            columns[-1] = (column_min, max(column_max, x_max), indices + [i])
+    return columns
+
+
+def is_plausible_receipt(text: List[str]) -> bool:
+    # A receipt on its own names its retailer and prints at least one price
+    return detect_retailer(text) is not None and any(re.search(price_pattern, line) for line in text)
+
+
+def split_lines(lines: list, gap_factor: float = 1.5) -> List[list]:
+    """
+    Splits one OCR result (result[0]) into one line list per receipt.
+    Returns [lines] unchanged unless every part is a plausible receipt on its own.
+    """
+    if not lines:
+        return []
+
+    gap = gap_factor * median(box_height(line[0]) for line in lines)
+    columns = x_columns(lines, gap)
+
+    # One receipt is usually several columns (names, prices), so columns are only cut
+    # between two columns that mention a retailer, at the widest gap between them
+    anchors = [c for c, (_, _, indices) in enumerate(columns)
+               if detect_retailer([lines[i][1][0] for i in indices]) is not None]
+    if len(anchors) < 2:
+        return [lines]
+
+    cuts = []
+    for a, b in zip(anchors, anchors[1:]):
+        cuts.append(max(range(a + 1, b + 1), key=lambda c: columns[c][0] - columns[c - 1][1]))
+
+    groups = []
+    for start, end in zip([0] + cuts, cuts + [len(columns)]):
+        indices = sorted(i for column in columns[start:end] for i in column[2])
+        # Back to the original reading order inside each receipt
+        groups.append([lines[i] for i in indices])
+
+    if not all(is_plausible_receipt([line[1][0] for line in group]) for group in groups):
+        return [lines]
+    return groups
+
+
+def detect_retailer(text: List[str]) -> Optional[str]:
+    for line in text:
+        upper = line.upper()
+        if "TESCO" in upper:
+            return "tesco"
+        if "SAINSBURY" in upper:
+            return "sainsbury"
+        if "LIDL" in upper:
+            return "lidl"
+    return None
+
+
+def parse_receipt(text: List[str]) -> Tuple[Optional[str], Any]:
+    """
+    Returns (retailer, parsed receipt). The receipt is None if the retailer is unknown
+    or the parser could not read it.
+    """
+    retailer = detect_retailer(text)
+    try:
+        if retailer == "tesco":
+            return retailer, tesco.extract_receipt_info(text)
+        if retailer == "sainsbury":
+            return retailer, sainsbury.extract_receipt_info(text)
+        if retailer == "lidl":
+            return retailer, lidl.receipt_info(text)
+    except (ValueError, IndexError):
+        pass
+    return retailer, None
+
+
+def parse_photo(result, executor: Optional[Executor] = None, gap_factor: float = 1.5) -> List[Tuple[Optional[str], Any]]:
+    """
+    Parses every receipt found in one ocr.ocr() result, left to right.
+    Parsing takes microseconds, so it runs in order unless a long lived executor is passed in.
+    """
+    groups = split_lines(result[0] or [], gap_factor=gap_factor)
+    texts = [[line[1][0] for line in group] for group in groups]
+    if executor is None or len(texts) <= 1:
+        return [parse_receipt(text) for text in texts]
+    return list(executor.map(parse_receipt, texts))
+
+
+if __name__ == "__main__":
+    from paddleocr import PaddleOCR
+
+    ocr = PaddleOCR(
+        lang="en",
+        use_angle_cls=True,
+        det_db_thresh=0.6,
+        det_db_box_thresh=0.5,
+        det_db_unclip_ratio=1.8
+    )
+    result = ocr.ocr("receipts/multiple#1.jpeg", cls=True)
+    for retailer, receipt in parse_photo(result):
+        print(retailer, receipt)
@@ -0,0 +1,148 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+
+"""
+PRICE HISTORY
+- Key: (retailer, canonical item name, store id)
+- Value: time sorted compact arrays
+    - date as ordinal (int32)
+    - price in pence (int32)
+    - flags (uint8): DISCOUNT, MEAL_DEAL
+- Range queries and latest price lookups are binary searches, appends are O(1)
+  when receipts arrive in date order
+- Fed from combine_entries (tesco.py) and extract_items (sainsbury.py, lidl.py) output
+- Receipts without a shopping date or store id raise ValueError before any item is added
+"""
+
+
+DISCOUNT = 1
+MEAL_DEAL = 2
+
+
+def canonical_name(name: str) -> str:
+    # OCR output differs in case, spacing and stray punctuation between receipts
+    name = re.sub(r"[^A-Z0-9%&. ]", " ", name.upper())
+    return " ".join(name.split())
+
+
+def to_pence(price: float) -> int:
+    return int(round(price * 100))
+
+
+def check_key(store_id, day) -> None:
+    # Tesco / Sainsbury's date and store id parsing can come back empty, check before adding items
+    if day is None:
+        raise ValueError("Receipt has no shopping date, cannot add it to the price history")
+    if store_id is None or store_id == "":
+        raise ValueError("Receipt has no store id, cannot add it to the price history")
+
+
+def to_ordinal(day) -> int:
+    if isinstance(day, datetime):
+        day = day.date()
+    return day.toordinal()
+
+
+class PriceSeries:
+    def __init__(self):
+        self.dates = array("i")
+        self.prices = array("i")
+        self.flags = array("B")
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def add(self, ordinal: int, pence: int, flags: int) -> None:
+        if not self.dates or ordinal >= self.dates[-1]:
+            self.dates.append(ordinal)
+            self.prices.append(pence)
+            self.flags.append(flags)
+            return
+        # Late arriving receipt, keep the arrays sorted
+        idx = bisect_right(self.dates, ordinal)
+        self.dates.insert(idx, ordinal)
+        self.prices.insert(idx, pence)
+        self.flags.insert(idx, flags)
+
+    def range(self, start: int, end: int) -> List[Tuple[date, int, int]]:
+        lo = bisect_left(self.dates, start)
+        hi = bisect_right(self.dates, end)
+        return [(date.fromordinal(self.dates[i]), self.prices[i], self.flags[i]) for i in range(lo, hi)]
+
+    def latest(self, on_or_before: Optional[int] = None) -> Optional[Tuple[date, int, int]]:
+        idx = len(self.dates) if on_or_before is None else bisect_right(self.dates, on_or_before)
+        if idx == 0:
+            return None
+        idx -= 1
+        return date.fromordinal(self.dates[idx]), self.prices[idx], self.flags[idx]
+
+
+class PriceHistory:
+    def __init__(self):
+        self.series: Dict[Tuple[str, str, str], PriceSeries] = {}
+
+    def add(self, retailer: str, name: str, store_id: str, day, price: float, flags: int = 0) -> None:
+        check_key(store_id, day)
+        key = (retailer, canonical_name(name), str(store_id))
+        self.series.setdefault(key, PriceSeries()).add(to_ordinal(day), to_pence(price), flags)
+
+    def range(self, retailer: str, name: str, store_id: str, start, end) -> List[Tuple[date, int, int]]:
+        """
+        Returns [(date, price in pence, flags)] between start and end (inclusive), oldest first.
+        """
+        series = self.series.get((retailer, canonical_name(name), str(store_id)))
+        if series is None:
+            return []
+        return series.range(to_ordinal(start), to_ordinal(end))
+
+    def latest(self, retailer: str, name: str, store_id: str, on_or_before=None) -> Optional[Tuple[date, int, int]]:
+        series = self.series.get((retailer, canonical_name(name), str(store_id)))
+        if series is None:
+            return None
+        return series.latest(None if on_or_before is None else to_ordinal(on_or_before))
+
+    def add_tesco_items(self, store_id: str, day, items) -> None:
+        # items: combine_entries output
+        check_key(store_id, day)
+        for item in items:
+            flags = (DISCOUNT if item.discount else 0) | (MEAL_DEAL if item.is_meal_deal else 0)
+            self.add("Tesco", item.name, store_id, day, item.price, flags)
+
+    def add_sainsbury_items(self, shop_id: str, day, items, meal_deal_items=()) -> None:
+        # items, meal_deal_items: extract_items output
+        check_key(shop_id, day)
+        discounted = False
+        for item in reversed(items):
+            # A savings line belongs to the product printed just above it
+            if item.is_savings:
+                discounted = True
+                continue
+            self.add("Sainsbury's", item.name, shop_id, day, item.price, DISCOUNT if discounted else 0)
+            discounted = False
+        for item in meal_deal_items:
+            self.add("Sainsbury's", item.name, shop_id, day, item.price, MEAL_DEAL)
+
+    def add_lidl_items(self, market_address: str, day, items) -> None:
+        # items: extract_items output, price looks like "1.65A" (VAT code suffix)
+        check_key(market_address, day)
+        for item in items:
+            match = re.match(r"^(\d+\.\d+)", item.price)
+            if match:
+                self.add("Lidl", item.name, market_address, day, float(match.group(1)))
+
+
+"""
+# Example usage:
+from tesco import combine_entries, extract_items_and_prices, clean_data, extract_receipt_info
+
+history = PriceHistory()
+receipt = extract_receipt_info(text)
+history.add_tesco_items(receipt.store_id, receipt.shopping_date,
+                        combine_entries(extract_items_and_prices(clean_data(text))))
+print(history.range("Tesco", "Tesco Semi Skimmed Milk 4 Pints", "1234", date(2024, 1, 1), date(2024, 12, 31)))
+print(history.latest("Tesco", "Tesco Semi Skimmed Milk 4 Pints", "1234"))
+"""
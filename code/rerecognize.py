@@ -0,0 +1,133 @@
+import re
+import cv2
+import numpy as np
+from typing import List, Set, Tuple
+import paddleocr  # noqa: F401 - puts paddleocr's bundled tools package on the path
+from tools.infer.utility import get_rotate_crop_image
+
+
+"""
+RE-RECOGNITION
+- OCR returns a confidence score per line, which the retailer scripts ignore
+- Critical lines:
+    - anchor lines ("TOTAL", "BALANCE DUE", Clubcard / Nectar points, ...) and the value next to them
+    - price lines (X.XX, £X.XX, -X.XX, 1.65A)
+- Critical lines below the confidence threshold are cropped from the original image
+  and recognised again on their own (no detection, no full second pass)
+- The second pass has to see a different input than the first, the recogniser resizes
+  every crop to its own input height, so upscaling alone changes nothing:
+    - the detection box is padded outward, tight boxes clip descenders, decimal points and "£"
+    - CLAHE evens out shadows and faded print along the line, Otsu then binarises it
+    - optionally a stronger recogniser (server model, wider rec_image_shape) for this pass only
+- The new reading replaces the old one only if it is more confident
+"""
+
+
+ANCHORS = [
+    "TOTAL", "BALANCE DUE", "Subtotal", "Savings", "PROMOTIONS", "CHANGE",
+    "Clubcard points", "POINTS EARNED", "POINTS BALANCE", "YOUR POINTS ARE WORTH"
+]
+
+price_pattern = r'^-?£?\d+\.\d{2}[A-Z]?$'
+
+
+def critical_line_indices(text: List[str]) -> Set[int]:
+    critical = set()
+    for i, line in enumerate(text):
+        if re.match(price_pattern, line.replace(" ", "")):
+            critical.add(i)
+        elif any(anchor.lower() in line.lower() for anchor in ANCHORS):
+            critical.add(i)
+            # The value is printed on the next line (Clubcard points sometimes on the previous one)
+            if i + 1 < len(text):
+                critical.add(i + 1)
+            if i > 0:
+                critical.add(i - 1)
+    return critical
+
+
+def pad_box(box: List[List[float]], pad_ratio: float = 0.25) -> np.ndarray:
+    # Grows the box along its own axes (top left, top right, bottom right, bottom left order),
+    # by pad_ratio x line height on every side, so a tilted box stays tilted
+    box = np.array(box, dtype=np.float32)
+    along = box[1] - box[0]
+    across = box[3] - box[0]
+    height = (np.linalg.norm(box[3] - box[0]) + np.linalg.norm(box[2] - box[1])) / 2
+    along = along / max(np.linalg.norm(along), 1e-6) * height * pad_ratio
+    across = across / max(np.linalg.norm(across), 1e-6) * height * pad_ratio
+    return np.array([
+        box[0] - along - across,
+        box[1] + along - across,
+        box[2] + along + across,
+        box[3] - along + across,
+    ], dtype=np.float32)
+
+
+def enhance(crop: np.ndarray) -> np.ndarray:
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    # One tile row, a line crop is only a few characters high
+    gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(1, 8)).apply(gray)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # The recogniser expects 3 channel input
+    return cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
+
+
+def crop_box(image: np.ndarray, box: List[List[float]], min_height: int = 48,
+             pad_ratio: float = 0.25) -> np.ndarray:
+    # Perspective crop of the (possibly tilted) box, an axis aligned rectangle would
+    # pick up parts of the neighbouring lines on a slanted photo
+    crop = get_rotate_crop_image(image, pad_box(box, pad_ratio))
+
+    # Upscale before thresholding so the binarised strokes keep smooth edges
+    scale = max(2.0, min_height / max(crop.shape[0], 1))
+    crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    return enhance(crop)
+
+
+def rerecognize_low_confidence(ocr, image: np.ndarray, boxes: List[List[List[float]]], text: List[str],
+                               scores: List[float], threshold: float = 0.9,
+                               recognizer=None) -> Tuple[List[str], List[float]]:
+    """
+    Re-runs recognition on the low confidence critical lines only.
+    recognizer: optional second PaddleOCR instance (e.g. the server recognition model)
+    used for this pass instead of ocr's own recogniser.
+    Returns new (text, scores) lists, the inputs are not modified.
+    """
+    text = list(text)
+    scores = list(scores)
+    targets = sorted(i for i in critical_line_indices(text) if scores[i] < threshold)
+    if not targets:
+        return text, scores
+
+    crops = [crop_box(image, boxes[i]) for i in targets]
+    if ocr.use_angle_cls:
+        crops, _, _ = ocr.text_classifier(crops)
+    # All crops go through the recognizer in one batched call
+    rec_res, _ = (recognizer or ocr).text_recognizer(crops)
+
+    for i, (new_text, new_score) in zip(targets, rec_res):
+        if new_text and new_score > scores[i]:
+            text[i] = new_text
+            scores[i] = new_score
+    return text, scores
+
+
+"""
+# Example usage:
+from paddleocr import PaddleOCR
+
+ocr = PaddleOCR(lang="en", use_angle_cls=True)
+image = cv2.imread("receipts/sainsbury#8.jpeg")
+result = ocr.ocr(image, cls=True)
+
+boxes = [line[0] for line in result[0]]
+text = [line[1][0] for line in result[0]]
+scores = [line[1][1] for line in result[0]]
+
+text, scores = rerecognize_low_confidence(ocr, image, boxes, text, scores)
+print(text)
+
+# Stronger model for the second pass only
+server_rec = PaddleOCR(lang="en", rec_model_dir="models/rec_server_infer", rec_image_shape="3, 48, 640")
+text, scores = rerecognize_low_confidence(ocr, image, boxes, text, scores, recognizer=server_rec)
+"""
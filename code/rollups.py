@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+"""
+ROLLUPS
+- Totals kept up to date as each parsed receipt is ingested, instead of rescanning every receipt
+- Buckets:
+    - (retailer, store id, ISO week)
+    - (retailer, ISO week)
+- Per bucket: spend, savings (both in pence), item count, loyalty points earned, receipt count
+    - integer pence so adding and subtracting reprocessed receipts never drifts
+- Reprocessed receipts: the old contribution is subtracted before the new one is added
+- Works on TescoReceipt (tesco.py), Receipt (sainsbury.py) and LidlReceipt (lidl.py)
+"""
+
+
+@dataclass
+class Rollup:
+    spend_pence: int = 0
+    savings_pence: int = 0
+    item_count: int = 0
+    points_earned: int = 0
+    receipt_count: int = 0
+
+    def add(self, other: "Rollup", sign: int = 1) -> None:
+        self.spend_pence += sign * other.spend_pence
+        self.savings_pence += sign * other.savings_pence
+        self.item_count += sign * other.item_count
+        self.points_earned += sign * other.points_earned
+        self.receipt_count += sign * other.receipt_count
+
+
+@dataclass
+class Contribution:
+    retailer: str
+    store_id: str
+    week: Tuple[int, int]  # (ISO year, ISO week)
+    totals: Rollup
+
+
+def to_pence(price: float) -> int:
+    return int(round(price * 100))
+
+
+def iso_week(shopping_date) -> Tuple[int, int]:
+    if isinstance(shopping_date, (date, datetime)):
+        iso = shopping_date.isocalendar()
+        return iso[0], iso[1]
+    return 0, 0  # date could not be read from the receipt
+
+
+def receipt_contribution(receipt: Any) -> Contribution:
+    """
+    Normalises the three retailer receipt dataclasses into one rollup contribution.
+    """
+    retailer = receipt.market_name
+
+    # Tesco: store_id, Sainsbury's: shop_id, Lidl: only the address is printed
+    store_id = getattr(receipt, "store_id", None) or getattr(receipt, "shop_id", None) \
+        or getattr(receipt, "market_address", None) or "unknown"
+
+    # Tesco: savings, Sainsbury's: promotions_savings
+    savings = getattr(receipt, "savings", None) or getattr(receipt, "promotions_savings", None) or 0.0
+
+    # Sainsbury's prints the item count, otherwise count the parsed items
+    item_count = getattr(receipt, "total_items", None)
+    if not item_count:
+        items = receipt.items if isinstance(receipt.items, list) else []
+        item_count = len(items) + len(getattr(receipt, "meal_deal_items", None) or [])
+
+    points_earned = 0
+    clubcard_info = getattr(receipt, "clubcard_info", None)
+    nectar_details = getattr(receipt, "nectar_details", None)
+    if clubcard_info is not None and clubcard_info.points_earned:
+        points_earned = clubcard_info.points_earned
+    elif nectar_details is not None and nectar_details.points_earned:
+        points_earned = nectar_details.points_earned
+
+    return Contribution(
+        retailer=retailer,
+        store_id=str(store_id),
+        week=iso_week(receipt.shopping_date),
+        totals=Rollup(
+            spend_pence=to_pence(receipt.total_price or 0.0),
+            savings_pence=to_pence(savings),
+            item_count=item_count,
+            points_earned=points_earned,
+            receipt_count=1
+        )
+    )
+
+
+class SpendRollups:
+    def __init__(self):
+        self.by_store: Dict[Tuple[str, str, Tuple[int, int]], Rollup] = {}
+        self.by_retailer: Dict[Tuple[str, Tuple[int, int]], Rollup] = {}
+        # receipt id -> what it added, so a reprocessed receipt can be taken back out
+        self.contributions: Dict[str, Contribution] = {}
+
+    def _apply(self, contribution: Contribution, sign: int) -> None:
+        store_key = (contribution.retailer, contribution.store_id, contribution.week)
+        retailer_key = (contribution.retailer, contribution.week)
+        for buckets, key in ((self.by_store, store_key), (self.by_retailer, retailer_key)):
+            bucket = buckets.setdefault(key, Rollup())
+            bucket.add(contribution.totals, sign)
+            if bucket.receipt_count == 0:
+                del buckets[key]
+
+    def ingest(self, receipt_id: str, receipt: Any) -> None:
+        """
+        Adds a receipt to the rollups. Ingesting the same receipt id again replaces
+        the earlier version instead of counting it twice.
+        """
+        self.remove(receipt_id)
+        contribution = receipt_contribution(receipt)
+        self._apply(contribution, 1)
+        self.contributions[receipt_id] = contribution
+
+    def remove(self, receipt_id: str) -> None:
+        contribution = self.contributions.pop(receipt_id, None)
+        if contribution is not None:
+            self._apply(contribution, -1)
+
+    def store_week(self, retailer: str, store_id: str, week: Tuple[int, int]) -> Rollup:
+        return self.by_store.get((retailer, store_id, week), Rollup())
+
+    def retailer_week(self, retailer: str, week: Tuple[int, int]) -> Rollup:
+        return self.by_retailer.get((retailer, week), Rollup())
+
+    def retailer_total(self, retailer: str, start: Optional[Tuple[int, int]] = None,
+                       end: Optional[Tuple[int, int]] = None) -> Rollup:
+        # O(number of buckets), optionally limited to an ISO week range (inclusive)
+        total = Rollup()
+        for (name, week), bucket in self.by_retailer.items():
+            if name != retailer:
+                continue
+            if (start is not None and week < start) or (end is not None and week > end):
+                continue
+            total.add(bucket)
+        return total
+
+
+"""
+# Example usage:
+from tesco import extract_receipt_info
+
+rollups = SpendRollups()
+rollups.ingest("upload-1", extract_receipt_info(text))
+rollups.ingest("upload-1", extract_receipt_info(text))  # reprocessed, replaces the first one
+for key, bucket in rollups.by_store.items():
+    print(key, bucket)
+"""
@@ -82,21 +82,6 @@ class Receipt:
     nectar_details: Optional[NectarDetails] = None
 
 
-# OCR
-# OCR
-ocr = PaddleOCR(
-    lang="en",
-    use_angle_cls=True,  # Detect text orientation
-    det_db_thresh=0.6,   # Adjust detection threshold
-    det_db_box_thresh=0.5,  # Adjust box threshold
-    det_db_unclip_ratio=1.8  # Adjust unclip ratio
-)
-result = ocr.ocr("receipts/sainsbury#8.jpeg", cls=True)
-
-boxes = [line[0] for line in result[0]]
-text = [line[1][0] for line in result[0]]
-scores = [line[1][1] for line in result[0]]
-
 def extract_nectar_details(receipt_lines: list[str]) -> NectarDetails:
     details = {}
     
@@ -262,6 +247,7 @@ def extract_receipt_info(receipt_lines: list[str]) -> Receipt:
 
     # Extract total price from BALANCE DUE
     total_price = 0.0
+    balance_idx = None
     try:
         balance_idx = [i for i, line in enumerate(receipt_lines) if "BALANCE DUE" in line][0]
         total_price = float(receipt_lines[balance_idx + 1].replace('£', ''))
@@ -269,7 +255,12 @@ def extract_receipt_info(receipt_lines: list[str]) -> Receipt:
         pass
 
     # Count total number of items
-    total_items = int(text[balance_idx].split()[0])
+    total_items = 0
+    if balance_idx is not None:
+        try:
+            total_items = int(receipt_lines[balance_idx].split()[0])
+        except (ValueError, IndexError):
+            pass
 
     # Determine payment type and extract card details if applicable
     payment_type = "CARD" if any("Visa DEBIT" in line for line in receipt_lines) else "CASH"
@@ -363,23 +354,36 @@ def extract_receipt_info(receipt_lines: list[str]) -> Receipt:
         meal_deal_items=meal_deal_items,
         shop_id=shop_id,
         shopping_time=shopping_time,
-        shopping_date=shopping_date
+        shopping_date=shopping_date,
+        nectar_details=nectar_details
     )
 
-# Example usage:
-
-#"""
-receipt = extract_receipt_info(text)
-print(f"Market: {receipt.market_name}")
-print(f"Address: {receipt.market_address}")
-print(f"items: {receipt.items}")
-print(f"Total Items: {receipt.total_items}")
-print(f"Total Price: £{receipt.total_price:.2f}")
-print(f"Payment Type: {receipt.payment_type}")
-print(f"Promotions: £{receipt.promotions_savings:.2f}")
-print(f"Shop ID: {receipt.shop_id}")
-print(f"Shopping Time: {receipt.shopping_time}")
-print(f"Shopping Date: {receipt.shopping_date.strftime('%d-%m-%Y') if receipt.shopping_date else None}")
-#"""
-
-print(text)
\ No newline at end of file
+if __name__ == "__main__":
+    # OCR
+    ocr = PaddleOCR(
+        lang="en",
+        use_angle_cls=True,  # Detect text orientation
+        det_db_thresh=0.6,   # Adjust detection threshold
+        det_db_box_thresh=0.5,  # Adjust box threshold
+        det_db_unclip_ratio=1.8  # Adjust unclip ratio
+    )
+    result = ocr.ocr("receipts/sainsbury#8.jpeg", cls=True)
+
+    boxes = [line[0] for line in result[0]]
+    text = [line[1][0] for line in result[0]]
+    scores = [line[1][1] for line in result[0]]
+
+    # Example usage:
+    receipt = extract_receipt_info(text)
+    print(f"Market: {receipt.market_name}")
+    print(f"Address: {receipt.market_address}")
+    print(f"items: {receipt.items}")
+    print(f"Total Items: {receipt.total_items}")
+    print(f"Total Price: £{receipt.total_price:.2f}")
+    print(f"Payment Type: {receipt.payment_type}")
+    print(f"Promotions: £{receipt.promotions_savings:.2f}")
+    print(f"Shop ID: {receipt.shop_id}")
+    print(f"Shopping Time: {receipt.shopping_time}")
+    print(f"Shopping Date: {receipt.shopping_date.strftime('%d-%m-%Y') if receipt.shopping_date else None}")
+
+    print(text)
@@ -61,23 +61,6 @@ class TescoReceipt:
     payment_type: str  = "Card" #default is card
 
 
-# OCR
-ocr = PaddleOCR(
-    lang="en",
-    use_angle_cls=True,  # Detect text orientation
-    det_db_thresh=0.6,   # Adjust detection threshold
-    det_db_box_thresh=0.5,  # Adjust box threshold
-    det_db_unclip_ratio=1.8  # Adjust unclip ratio
-)
-result = ocr.ocr("test.jpeg", cls=True)
-
-boxes = [line[0] for line in result[0]]
-text = [line[1][0] for line in result[0]]
-scores = [line[1][1] for line in result[0]]
-
-print(text)
-
-
 def is_similar_to_clubcard_points_earned(word, threshold=0.9):
     target = "Clubcard points earned:"
     similarity = ratio(target.lower(), word.lower())
@@ -247,7 +230,6 @@ def combine_entries(data):
         
     return result
 
-print(combine_entries(extract_items_and_prices(clean_data(text))))
         
 def extract_datetime(text: List[str]) -> tuple:
     """
@@ -341,10 +323,14 @@ def extract_receipt_info(text: List[str]) -> TescoReceipt:
     # Extract clubcard info
     clubcard_info = extract_clubcard_info(text)
 
+    # Extract items
+    items = combine_entries(extract_items_and_prices(clean_data(text)))
+
     return TescoReceipt(
         market_address=market_address,
         total_price=total_price,
         store_id=store_id if store_id else None,
+        items=items,
         shopping_time=shopping_time,
         shopping_date=shopping_date,
         subtotal=subtotal,
@@ -353,4 +339,22 @@ def extract_receipt_info(text: List[str]) -> TescoReceipt:
     )
 
 
-print(extract_receipt_info(text))
\ No newline at end of file
+if __name__ == "__main__":
+    # OCR
+    ocr = PaddleOCR(
+        lang="en",
+        use_angle_cls=True,  # Detect text orientation
+        det_db_thresh=0.6,   # Adjust detection threshold
+        det_db_box_thresh=0.5,  # Adjust box threshold
+        det_db_unclip_ratio=1.8  # Adjust unclip ratio
+    )
+    result = ocr.ocr("test.jpeg", cls=True)
+
+    boxes = [line[0] for line in result[0]]
+    text = [line[1][0] for line in result[0]]
+    scores = [line[1][1] for line in result[0]]
+
+    print(text)
+
+    print(combine_entries(extract_items_and_prices(clean_data(text))))
+    print(extract_receipt_info(text))
@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+
+from dedup import DedupCache
+
+
+ITEMS = ["MILK 4PT", "BREAD WHITE", "EGGS 12", "BANANAS", "CHEDDAR 400G", "PASTA 500G",
+         "APPLES", "YOGHURT", "BUTTER", "COFFEE", "TEA BAGS", "RICE 1KG"]
+
+
+class FakeRecognizer:
+    """
+    Stands in for PaddleOCR's recogniser: returns what is really printed on the key lines
+    of the photo being checked, and records the crops it was given.
+    """
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.crops = []
+
+    def text_recognizer(self, crops):
+        self.crops = crops
+        return [(text, 0.99) for text in self.texts], 0.0
+
+
+def render_receipt(prices, total, date="16/11/2024 18:04"):
+    # Receipt paper on a dark table, returns (photo, OCR style lines in photo coordinates)
+    photo = np.full((1400, 1000), 60, dtype=np.uint8)
+    paper = np.full((1200, 500), 245, dtype=np.uint8)
+    lines = []
+
+    def put(text, x, y, scale=0.8, thickness=2):
+        cv2.putText(paper, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, 20, thickness)
+        (width, height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        x, y = x + 250, y + 100
+        lines.append([[[x, y - height - 4], [x + width, y - height - 4], [x + width, y + 6], [x, y + 6]],
+                      (text, 0.99)])
+
+    put("TESCO", 180, 60, 1.5, 3)
+    put("Store1234 Stratford", 60, 110)
+    for i, (name, price) in enumerate(zip(ITEMS, prices)):
+        put(name, 30, 180 + i * 60)
+        put(price, 400, 180 + i * 60)
+    put("TOTAL", 30, 1000)
+    put(total, 400, 1000)
+    put(date, 30, 1100)
+    photo[100:1300, 250:750] = paper
+    return photo, lines
+
+
+def recrop(photo):
+    # Slightly rotated, cropped and darker re-upload of the same photo
+    height, width = photo.shape
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), 3, 1.0)
+    rotated = cv2.warpAffine(photo, rotation, (width, height), borderValue=60)[30:1380, 20:990]
+    return cv2.convertScaleAbs(rotated, alpha=0.85, beta=15)
+
+
+def stored_cache(tmp_path):
+    photo, lines = render_receipt([f"{i + 1}.25" for i in range(len(ITEMS))], "48.00")
+    path = str(tmp_path / "first.png")
+    cv2.imwrite(path, photo)
+    cache = DedupCache()
+    parsed, digest, fingerprint = cache.lookup(path)
+    assert parsed is None
+    cache.store("first", digest, fingerprint, "first receipt", lines)
+    return cache, photo
+
+
+def test_same_items_different_prices_is_a_miss(tmp_path):
+    cache, _ = stored_cache(tmp_path)
+    photo, _ = render_receipt([f"{i + 1}.75" for i in range(len(ITEMS))], "54.00")
+    path = str(tmp_path / "next_week.png")
+    cv2.imwrite(path, photo)
+
+    recognizer = FakeRecognizer(["TOTAL", "54.00", "16/11/2024 18:04"])
+    parsed, _, _ = cache.lookup(path, recognizer)
+    assert parsed is None
+    assert len(recognizer.crops) == 3
+    assert cache.stats.near_hits == 0
+
+
+def test_recropped_upload_is_a_near_hit(tmp_path):
+    cache, photo = stored_cache(tmp_path)
+    path = str(tmp_path / "recrop.png")
+    cv2.imwrite(path, recrop(photo))
+
+    recognizer = FakeRecognizer(["TOTAL", "48.00", "16/11/2024 18:04"])
+    parsed, _, _ = cache.lookup(path, recognizer)
+    assert parsed == "first receipt"
+    assert cache.stats.near_hits == 1
+    # The stored key line boxes land on text in the re-cropped photo
+    assert all(crop.min() < 100 for crop in recognizer.crops)
+
+
+def test_near_duplicate_is_not_reused_without_verification(tmp_path):
+    cache, photo = stored_cache(tmp_path)
+    path = str(tmp_path / "recrop.png")
+    cv2.imwrite(path, recrop(photo))
+
+    parsed, _, _ = cache.lookup(path)
+    assert parsed is None
+
+
+def test_exact_duplicate_skips_fingerprinting(tmp_path):
+    cache, _ = stored_cache(tmp_path)
+    parsed, _, fingerprint = cache.lookup(str(tmp_path / "first.png"))
+    assert parsed == "first receipt"
+    assert fingerprint is None
+    assert cache.stats.exact_hits == 1
@@ -0,0 +1,39 @@
+from multi_receipt import split_lines
+
+
+def line(x_min, x_max, y, text):
+    return [[[x_min, y], [x_max, y], [x_max, y + 20], [x_min, y + 20]], (text, 0.99)]
+
+
+def receipt_lines(retailer, offset=0):
+    # Centred header, item names on the left, right aligned prices
+    lines = [line(offset + 250, offset + 330, 0, retailer)]
+    for n in range(5):
+        lines.append(line(offset + 20, offset + 180, 40 + 30 * n, f"ITEM {n + 1}"))
+        lines.append(line(offset + 500, offset + 560, 40 + 30 * n, f"{n + 1}.50"))
+    lines.append(line(offset + 20, offset + 180, 200, "TOTAL"))
+    lines.append(line(offset + 500, offset + 560, 200, "9.00"))
+    return lines
+
+
+def test_split_lines_keeps_one_receipt_whole():
+    lines = receipt_lines("TESCO")
+    groups = split_lines(lines)
+    assert groups == [lines]
+
+
+def test_split_lines_splits_receipts_side_by_side():
+    left = receipt_lines("TESCO")
+    right = receipt_lines("LIDL", offset=900)
+    groups = split_lines(left + right)
+    assert groups == [left, right]
+
+
+def test_split_lines_needs_a_price_in_every_part():
+    # "TESCO" in an item name column must not turn a price-less column into a receipt
+    lines = [line(20, 180, 0, "TESCO MILK"), line(250, 330, 0, "TESCO"), line(500, 560, 0, "1.50")]
+    assert split_lines(lines) == [lines]
+
+
+def test_split_lines_empty():
+    assert split_lines([]) == []
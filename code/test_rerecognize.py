@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("tools.infer.utility")
+from tools.infer.utility import get_rotate_crop_image  # noqa: E402
+
+from rerecognize import crop_box, rerecognize_low_confidence  # noqa: E402
+
+
+class FakeRecognizer:
+    use_angle_cls = False
+
+    def __init__(self, reading):
+        self.reading = reading
+        self.crops = []
+
+    def text_recognizer(self, crops):
+        self.crops = crops
+        return [self.reading for _ in crops], 0.0
+
+
+def shadowed_line():
+    # Faded price on paper with a shadow across it, detection box clipping the bottom of the digits
+    image = np.tile(np.linspace(250, 150, 400, dtype=np.uint8), (120, 1))
+    image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    cv2.putText(image, "12.34", (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (110, 110, 110), 2)
+    box = [[36, 50], [170, 50], [170, 76], [36, 76]]
+    return image, box
+
+
+def as_recognizer_input(crop, height=48):
+    # The recogniser resizes every crop to its input height before reading it
+    width = int(crop.shape[1] * height / crop.shape[0])
+    return cv2.resize(crop, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def test_second_pass_input_differs_from_the_first():
+    image, box = shadowed_line()
+    crop = crop_box(image, box, pad_ratio=0.25)
+    first = as_recognizer_input(get_rotate_crop_image(image, np.array(box, dtype=np.float32)))
+    second = as_recognizer_input(crop)
+
+    # Padded outward, the line sits in a differently framed input
+    assert second.shape != first.shape
+    # Binarised, the shadow gradient is gone
+    assert set(np.unique(crop)) <= {0, 255}
+    assert set(np.unique(first)) - {0, 255}
+    # The padding recovers the ink the tight box cut off at the bottom of the digits
+    box_height, pad = 26, 26 * 0.25
+    below_box = int(crop.shape[0] * (box_height + pad) / (box_height + 2 * pad)) + 2
+    assert (crop[below_box:] == 0).any()
+
+
+def test_low_confidence_prices_go_to_the_second_pass_recognizer():
+    image, box = shadowed_line()
+    ocr = FakeRecognizer(("12.84", 0.99))
+    server = FakeRecognizer(("12.34", 0.97))
+
+    text, scores = rerecognize_low_confidence(ocr, image, [box], ["12.84"], [0.6], recognizer=server)
+    assert text == ["12.34"]
+    assert scores == [0.97]
+    assert ocr.crops == []
+    assert len(server.crops) == 1
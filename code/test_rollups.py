@@ -0,0 +1,71 @@
+import sainsbury
+import tesco
+from rollups import SpendRollups
+
+
+# OCR style line lists, parsed with the real retailer parsers
+TESCO_TEXT = [
+    "TESCO", "Stratford Extra", "Store1234", "VAT NUMBER: 220 4302 31",
+    "MILK 4PT", "1.45", "Cc Milk", "-0.20", "BREAD", "1.10",
+    "Subtotal:", "2.55", "Savings:", "-0.20", "TOTAL", "2.35", "Card",
+    "Clubcard points earned:", "12", "Clubcard points balance:", "340",
+    "16/11/2024 18:04",
+]
+
+SAINSBURY_TEXT = [
+    "Sainsbury's", "Good food for all of us", "Stratford", "Vat Number: 660 4548 36",
+    "BANANAS", "0.90", "CHEDDAR", "3.25", "NECTAR PRICE SAVING", "-0.50",
+    "2 BALANCE DUE", "3.65", "Visa DEBIT", "PROMOTIONS", "-0.50",
+    "NECTAR", "[C]1234", "POINTS EARNED ON", "3.65", "PREVIOUS POINTS BALANCE", "100",
+    "POINTS EARNED", "4", "NEW POINTS BALANCE", "104", "YOUR POINTS ARE WORTH", "0.52",
+    "S2017", "18:04:4916NOV2024",
+]
+
+
+def test_tesco_receipt_counts_items_and_clubcard_points():
+    rollups = SpendRollups()
+    rollups.ingest("tesco-1", tesco.extract_receipt_info(TESCO_TEXT))
+
+    bucket = rollups.store_week("Tesco", "1234", (2024, 46))
+    assert bucket.spend_pence == 235
+    assert bucket.savings_pence == 20
+    assert bucket.item_count == 2
+    assert bucket.points_earned == 12
+    assert bucket.receipt_count == 1
+
+
+def test_sainsbury_receipt_counts_items_and_nectar_points():
+    rollups = SpendRollups()
+    rollups.ingest("sainsbury-1", sainsbury.extract_receipt_info(SAINSBURY_TEXT))
+
+    bucket = rollups.store_week("Sainsbury's", "S2017", (2024, 46))
+    assert bucket.spend_pence == 365
+    assert bucket.savings_pence == 50
+    assert bucket.item_count == 2
+    assert bucket.points_earned == 4
+
+
+def test_reprocessed_receipt_replaces_the_earlier_version():
+    rollups = SpendRollups()
+    rollups.ingest("tesco-1", tesco.extract_receipt_info(TESCO_TEXT))
+    rollups.ingest("tesco-1", tesco.extract_receipt_info(TESCO_TEXT))
+
+    bucket = rollups.retailer_week("Tesco", (2024, 46))
+    assert bucket.receipt_count == 1
+    assert bucket.item_count == 2
+
+    rollups.remove("tesco-1")
+    assert rollups.by_store == {}
+    assert rollups.by_retailer == {}
+
+
+def test_replacing_receipts_does_not_drift():
+    rollups = SpendRollups()
+    rollups.ingest("sainsbury-1", sainsbury.extract_receipt_info(SAINSBURY_TEXT))
+    for _ in range(100):
+        rollups.ingest("tesco-1", tesco.extract_receipt_info(TESCO_TEXT))
+
+    assert rollups.retailer_total("Tesco").spend_pence == 235
+    rollups.remove("tesco-1")
+    assert rollups.retailer_total("Tesco").spend_pence == 0
+    assert rollups.retailer_total("Sainsbury's").spend_pence == 365